@@ -0,0 +1,16 @@
+from pathlib import Path
+
+import text2png
+
+
+def test_font_size_fits_every_line(tmp_path: Path) -> None:
+    # At 1000pt "QQQQQ" is much wider, but at 4pt rounding makes "rrrrrrrr"
+    # 16px wide, which doesn't fit on a 15px canvas
+    pictures = text2png.main(
+        ["QQQQQ", "rrrrrrrr"],
+        output_dir=tmp_path,
+        size="15x200",
+        padding=0,
+        font="DejaVu Sans",
+    )
+    assert [picture.name for picture in pictures] == ["QQQQQ.png", "rrrrrrrr.png"]
@@ -1,24 +1,28 @@
 """Takes a text file and uses Pillow to generate PNGs of those lines of text"""
 import logging
 import math
+import os
+import subprocess
 import sys
 from argparse import ArgumentParser, ArgumentTypeError, Namespace
-from functools import reduce
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from numbers import Number
 from pathlib import Path
-from re import compile as re_compile
+from re import compile as re_compile, escape as re_escape, sub as re_sub
 from typing import List, NamedTuple, NewType, Optional, Tuple, Union, Dict
 from warnings import warn
 import atexit
 
-from matplotlib.font_manager import FontProperties, findfont
-from PIL import Image, ImageColor, ImageDraw
-from PIL.ImageFont import ImageFont, truetype as PILtruetype
+import numpy as np
+from PIL import Image, ImageColor
+from PIL.ImageFont import FreeTypeFont, ImageFont, truetype as PILtruetype
 from PIL.ImageColor import getrgb
 
 Num = Union[int, float]
 LogLevel = Optional[Union[int, str, bool]]
 SPath = Union[str, Path]
+Box = Tuple[int, int, int, int]
 
 
 class Size(NamedTuple):
@@ -31,92 +35,350 @@ class Position(NamedTuple):
     y: Num
 
 
+class PaddedArea(NamedTuple):
+    """The blank border around a canvas, and the area inside it that text can
+    use, which stay the same for every picture"""
+
+    canvas_size: Size
+    padding_width: Num
+    padding_height: Num
+    usable_width: Num
+    usable_height: Num
+
+
 default_font = "sans-serif"
+# Family names that stand for whichever font the system prefers
+generic_font_families = {"sans-serif", "sans", "serif", "monospace", "mono"}
 default_output_dir = Path("./output")
 default_canvas_size = Size(1024, 1024)
 default_padding = 0.10
 default_background = "white"
 default_text_color = "black"
+default_compress_level = 1
 default_log_level: LogLevel = logging.WARNING
 
 
 # Regexes
 size_re = re_compile(r"^(?P<width>\d+)x(?P<height>\d+)$")
-comment_re = re_compile(r"^\s*(#|＃).*$")
-blank_re = re_compile(r"^\s+$")
+# Characters that can't be in a file name on this platform
+if os.name == "nt":
+    invalid_name_characters = '/\\:*?"<>|\x00'
+else:
+    invalid_name_characters = "".join(filter(None, (os.sep, os.altsep, "\x00")))
+valid_name_re = re_compile(f"[^{re_escape(invalid_name_characters)}]+")
 
 
-def assign_path(text: str, dir: Union[Path, str]) -> Path:
-    proper_dir = Path(dir)
-    if proper_dir.exists() and not proper_dir.is_dir():
-        raise FileExistsError(f"'{proper_dir}' is not a directory")
-    elif proper_dir.exists():
-        proper_path = proper_dir / (text + ".png")
-    else:
-        proper_dir.mkdir()
-        proper_path = proper_dir / (text + ".png")
+def ensure_output_dir(dir: SPath) -> Path:
+    """Creates the output directory if it's missing, and returns its full path
+
+    Called once per run, so assign_path doesn't need to check the directory
+    for every line"""
+    proper_dir = Path(dir).expanduser()
+    proper_dir.mkdir(parents=True, exist_ok=True)
+    return proper_dir.resolve()
+
+
+def assign_path(text: str, dir: str) -> str:
+    """Path of the picture for a line of text
+
+    dir must already exist; see ensure_output_dir
+    This is called for every line, so it joins plain strings instead of
+    building Path objects"""
+    return os.path.join(dir, text + ".png")
+
+
+@lru_cache(maxsize=None)
+def _find_font_file(font_name: str) -> str:
+    """Memoized path to the font file for a font name
+
+    Asks fontconfig, or looks in the Windows font directory, before falling
+    back to matplotlib, which is slow to import and to build its font cache"""
+    if os.name == "posix":
+        # fc-match always finds some font, so it's limited to ones that can be
+        # scaled to any size, and a substitute is warned about, like
+        # matplotlib's findfont() does
+        pattern = re_sub(r"([\\:,-])", r"\\\1", font_name) + ":outline=True"
+        try:
+            font_file, _, families = (
+                subprocess.run(
+                    ["fc-match", "--format=%{file}\n%{family}", pattern],
+                    capture_output=True,
+                    check=True,
+                    text=True,
+                )
+                .stdout.strip()
+                .partition("\n")
+            )
+        except (OSError, subprocess.CalledProcessError):
+            font_file = ""
+        if font_file:
+            wanted = font_name.lower().replace(" ", "")
+            found = families.split(",")
+            if wanted not in generic_font_families and wanted not in (
+                family.lower().replace(" ", "") for family in found
+            ):
+                logging.warning(
+                    f"Font family '{font_name}' not found; using '{found[0]}' instead"
+                )
+            return font_file
+    elif os.name == "nt" and "WINDIR" in os.environ:
+        wanted = font_name.lower().replace(" ", "")
+        try:
+            with os.scandir(Path(os.environ["WINDIR"]) / "Fonts") as entries:
+                for entry in entries:
+                    stem, extension = os.path.splitext(entry.name.lower())
+                    if stem == wanted and extension in (".ttf", ".otf", ".ttc"):
+                        return entry.path
+        except OSError:
+            pass
+
+    from matplotlib.font_manager import FontProperties, findfont
+
+    return str(findfont(FontProperties(family=[font_name])))
+
+
+@lru_cache(maxsize=None)
+def _truetype(
+    font_file: str,
+    size: int,
+    index: int = 0,
+    encoding: str = "",
+    layout_engine: Optional[int] = None,
+) -> ImageFont:
+    """Memoized ImageFont.truetype, so each font file is parsed once per size"""
+    return PILtruetype(
+        font_file,
+        size=size,
+        index=index,
+        encoding=encoding,
+        layout_engine=layout_engine,
+    )
 
-    try:
-        proper_path.touch()
-    except OSError as err:
-        raise Exception(
-            "Filesystem error likely prevented using a particular filename"
-        ) from err
 
-    return proper_path.expanduser().resolve()
+@lru_cache(maxsize=None)
+def _text_size(font: ImageFont, text: str) -> Size:
+    """Memoized size of the text, measured from where it's drawn to the bottom
+    right of its bounding box
 
+    Same as font.getbbox(text)[2:], which only does layout, unlike the
+    deprecated font.getsize(), but calls the FreeType layer directly to skip
+    getbbox's Python wrapper
+    Fonts are hashed by identity, and live for the whole run"""
+    if not isinstance(font, FreeTypeFont):
+        # Bitmap fonts are always drawn right at the given point
+        return Size(*font.font.getsize(text))
+    (width, height), (offset_x, offset_y) = font.font.getsize(text)
+    return Size(offset_x + width, offset_y + height)
 
-def center_text_position(
-    text_size: Size, canvas_size: Size, padding: float
-) -> Position:
+
+@lru_cache(maxsize=1)
+def _getmask(
+    font: ImageFont, text: str
+) -> Tuple["Image.core.ImagingCore", Tuple[int, int]]:
+    """Memoized font.getmask2(text), the antialiased stencil of the text and
+    its offset from where the text is drawn
+
+    Each line is only drawn once, so only the latest mask is kept, for
+    text_box and generate_png to share without rasterizing the text twice"""
+    if not isinstance(font, FreeTypeFont):
+        return font.getmask(text, mode="L"), (0, 0)
+    return font.getmask2(text, mode="L")
+
+
+def padded_area(canvas_size: Size, padding: float) -> PaddedArea:
     padding_width = padding * canvas_size.width / 2
     padding_height = padding * canvas_size.height / 2
-    leftover_width = canvas_size.width - text_size.width - (padding_width * 2)
-    leftover_height = canvas_size.height - text_size.height - (padding_height * 2)
+    return PaddedArea(
+        canvas_size=canvas_size,
+        padding_width=padding_width,
+        padding_height=padding_height,
+        usable_width=canvas_size.width - (padding_width * 2),
+        usable_height=canvas_size.height - (padding_height * 2),
+    )
+
+
+def center_text_position(text_size: Size, area: PaddedArea) -> Position:
+    leftover_width = area.usable_width - text_size.width
+    leftover_height = area.usable_height - text_size.height
     if leftover_height < 0 or leftover_width < 0:
         raise ValueError("Calculation error: text too big for canvas")
 
-    x = math.floor((leftover_width / 2) + padding_width)
-    y = math.floor((leftover_height / 2) + padding_height)
+    # The padding is the same on both sides, so centering the text in the
+    # usable area is the same as centering it on the canvas, which only needs
+    # integer math
+    x = int(area.canvas_size.width - text_size.width) // 2
+    y = int(area.canvas_size.height - text_size.height) // 2
     # Pillow's coordinates have 0,0 in the upper-left corner, and text is drawn
     # to the down and right of the point given
     return Position(x, y)
 
 
+def is_opaque(color: ImageColor) -> bool:
+    return len(color) < 4 or color[3] == 255
+
+
+def blend_palette(background: ImageColor, fill_color: ImageColor) -> Tuple[str, bytes]:
+    """A 256 color palette where index i is the color Pillow gets by drawing
+    fill_color over background with an antialiasing coverage of i/255
+
+    A picture only ever has these colors, so it can be drawn as coverage
+    values on a palette image, which is a third of the size of an RGB image
+    but decodes to exactly the same pixels. The alpha channel is only kept if
+    one of the colors needs it"""
+    mode = "RGB" if is_opaque(background) and is_opaque(fill_color) else "RGBA"
+    strip = Image.new(mode, (256, 1), background)
+    coverage = Image.frombytes("L", (256, 1), bytes(range(256)))
+    strip.paste(fill_color, (0, 0, 256, 1), coverage)
+    return mode, strip.tobytes()
+
+
+@lru_cache(maxsize=1)
+def _blank_canvas(
+    canvas_size: Size, background: ImageColor, fill_color: ImageColor
+) -> Image.Image:
+    """Allocates one canvas per process, which generate_png clears and reuses
+    for every picture
+
+    The canvas is a palette image from blend_palette, so text is drawn on it
+    with index 255 over index 0"""
+    canvas = Image.new("P", canvas_size, 0)
+    palette_mode, palette = blend_palette(background=background, fill_color=fill_color)
+    canvas.putpalette(palette, rawmode=palette_mode)
+    return canvas
+
+
+def text_box(text: str, font: ImageFont, area: PaddedArea) -> Box:
+    """The part of the canvas generate_png draws the text on"""
+    text_position = center_text_position(text_size=_text_size(font, text), area=area)
+    mask, offset = _getmask(font, text)
+    x = text_position.x + offset[0]
+    y = text_position.y + offset[1]
+    return (x, y, x + mask.size[0], y + mask.size[1])
+
+
 def generate_png(
     text: str,
     font: ImageFont,
-    canvas_size: Size,
-    padding: Num,
+    canvas: Image.Image,
+    area: PaddedArea,
     background: ImageColor,
     fill_color: ImageColor,
-) -> Image:
-    canvas = Image.new("RGBA", canvas_size, background)
-    draw = ImageDraw.Draw(canvas)
-    text_size = Size(*font.getsize(text=text))
-    text_position = center_text_position(
-        text_size=text_size, canvas_size=canvas_size, padding=padding
+    dirty_box: Optional[Box] = None,
+) -> Box:
+    """Draws the text centered on the canvas, and returns the box it was drawn in
+
+    Only dirty_box is cleared to the background, if the rest of the canvas
+    already is; by default, the whole canvas is cleared"""
+    canvas.paste(background, dirty_box or (0, 0, *canvas.size))
+    # Same as ImageDraw.text(), but with the rasterized text cached
+    mask, _ = _getmask(font, text)
+    box = text_box(text=text, font=font, area=area)
+    canvas.im.paste(fill_color, box, mask)
+    return box
+
+
+class RenderSettings(NamedTuple):
+    """Everything about a picture except its text, which is the same for the
+    whole run"""
+
+    canvas_size: Size
+    area: PaddedArea
+    background: ImageColor
+    fill_color: ImageColor
+    compress_level: int
+    # Where worker processes load the font from
+    font_file: Optional[str] = None
+    font_size: int = 0
+    # Which face in a collection like a .ttc file, and how it's laid out
+    font_index: int = 0
+    font_encoding: str = ""
+    font_layout_engine: Optional[int] = None
+    # A font that can't be loaded from a file, which is used as is, and only
+    # in this process
+    font: Optional[ImageFont] = None
+
+
+# Set in each worker process by _init_worker
+_settings: Optional[RenderSettings] = None
+# The last canvas _render drew on, and where the text is on it
+_dirty_canvas: Optional[Image.Image] = None
+_dirty_box: Optional[Box] = None
+
+
+def _init_worker(settings: RenderSettings) -> None:
+    """Receives the settings once per worker process, so each task only has to
+    send a line of text and where to save it"""
+    global _settings
+    _settings = settings
+
+
+def _render(text: str) -> Image.Image:
+    """Draws one line of text on this process's canvas, which is reused for
+    the next line
+
+    The font is loaded from its file, since ImageFont objects can't be pickled
+    and sent to worker processes, unless main had to keep it in this process"""
+    global _dirty_canvas, _dirty_box
+    settings = _settings
+    canvas = _blank_canvas(
+        settings.canvas_size, settings.background, settings.fill_color
     )
-    draw.text(xy=text_position, text=text, fill=fill_color, font=font)
-    # Draws a circle to show text_position
-    # draw.ellipse(xy=[text_position.x-3,text_position.y-3,text_position.x+3,text_position.y+3], fill="black")
+    if settings.font is not None:
+        font = settings.font
+    else:
+        font = _truetype(
+            settings.font_file,
+            settings.font_size,
+            settings.font_index,
+            settings.font_encoding,
+            settings.font_layout_engine,
+        )
+    # The rest of the canvas is still the background, so only the previous
+    # text needs to be cleared
+    dirty_box = _dirty_box if _dirty_canvas is canvas else None
+    _dirty_box = generate_png(
+        text=text,
+        font=font,
+        canvas=canvas,
+        area=settings.area,
+        background=0,
+        fill_color=255,
+        dirty_box=dirty_box,
+    )
+    _dirty_canvas = canvas
     return canvas
 
 
-def not_comment_or_blank(string: str) -> bool:
-    return not bool(
-        comment_re.search(string) or blank_re.search(string) or string == ""
+def _save(picture: Image.Image, out_path: str) -> None:
+    picture.save(
+        fp=out_path,
+        format="PNG",
+        compress_level=_settings.compress_level,
+        optimize=False,
     )
 
 
-def which_exist(names: List[str], directory: Union[Path, str]) -> Dict[str, Path]:
+def _render_and_save(text: str, out_path: str) -> None:
+    """Renders one line of text and saves it as a PNG"""
+    _save(picture=_render(text), out_path=out_path)
+
+
+def not_comment_or_blank(string: str) -> bool:
+    # Two string methods are quicker than a regex for a check this simple
+    stripped = string.lstrip()
+    return bool(stripped) and not stripped.startswith(("#", "＃"))
+
+
+def which_exist(names: List[str], directory: Path) -> Dict[str, Path]:
     """Checks which file names are already taken in a directory,
     and raises an error if it wasn't a file that took the name"""
-    dir_path = Path(directory)
-    if not (dir_path.is_dir() and dir_path.exists()):
-        raise ValueError(f"'{dir_path}' must be a directory")
-    dir_contents = list(dir_path.iterdir())
-    non_files = [str(path) for path in filter(lambda f: not f.is_file(), dir_contents)]
+    if not directory.is_dir():
+        raise ValueError(f"'{directory}' must be a directory")
+    # DirEntry.is_file() uses the file type from the directory listing, so
+    # this is one pass over the directory instead of a stat per entry
+    with os.scandir(directory) as entries:
+        dir_contents = {entry.name: entry.is_file() for entry in entries}
+    non_files = {name for name, is_file in dir_contents.items() if not is_file}
     colliding_names = [name for name in names if name in non_files]
     for name in colliding_names:
         logging.error(
@@ -127,28 +389,43 @@ def which_exist(names: List[str], directory: Union[Path, str]) -> Dict[str, Path
         raise FileExistsError(
             f"These are names of files that would be created in '{directory}', but can't:\n{colliding_list}"
         )
-    return {file.name: file for file in dir_contents}
+    return {name: directory / name for name in dir_contents}
 
 
 def get_characters(
-    text_file_or_list: Union[Path, str, List[str]], directory: SPath, clobber: bool
+    text_file_or_list: Union[Path, str, List[str]], directory: Path, clobber: bool
 ) -> List[str]:
     """Returns a list of the lines from a file that aren't empty, and don't
     have a '#' as the first non-whitespace character
     Alternatively, takes a list of strings"""
     if isinstance(text_file_or_list, list):
-        lines = text_file_or_list
+        characters = list(filter(not_comment_or_blank, text_file_or_list))
     elif isinstance(text_file_or_list, str) or isinstance(text_file_or_list, Path):
         text_path = Path(text_file_or_list)
         if not text_path.is_file():
             raise Exception(f"'{text_path}' is not a file")
-        lines = text_path.read_text().splitlines()
+        # Filter while reading, so the whole file is never held in memory at once
+        with text_path.open(encoding="utf-8") as text_file:
+            characters = [
+                line
+                for line in (raw_line.rstrip("\r\n") for raw_line in text_file)
+                if not_comment_or_blank(line)
+            ]
     else:
         raise TypeError(
             f"text_file_or_list must be a path or list of characters; got:\n{text_file_or_list}"
         )
 
-    characters = list(filter(not_comment_or_blank, lines))
+    invalid_names = [
+        character for character in characters if not valid_name_re.fullmatch(character)
+    ]
+    for name in invalid_names:
+        logging.error(f"'{name}' can't be used as a file name")
+    if invalid_names:
+        invalid_list = "\n".join(invalid_names)
+        raise ValueError(
+            f"These lines can't be used as file names for pictures:\n{invalid_list}"
+        )
     # Check to see if any lines clash with existing directory or non-file names
     dir_contents = which_exist(
         names=[character + ".png" for character in characters], directory=directory
@@ -157,12 +434,14 @@ def get_characters(
     if clobber:
         filtered_lines = characters
     else:
-        unique_characters = set(characters)
-        dir_set = set(dir_contents.keys())
-        for line in unique_characters & dir_set:
-            logging.info(f"Not clobbering '{line}.png'")
-
-        filtered_lines = list(unique_characters - dir_set)
+        # dict.fromkeys() drops duplicates in one pass and keeps the file's order
+        unique_characters = dict.fromkeys(characters)
+        filtered_lines = []
+        for line in unique_characters:
+            if line + ".png" in dir_contents:
+                logging.info(f"Not clobbering '{line}.png'")
+            else:
+                filtered_lines.append(line)
 
     return filtered_lines
 
@@ -176,27 +455,38 @@ def parse_size(size: str) -> Size:
     return Size(width, height)
 
 
-def get_max_text_size(lines: List[str], font: str) -> Size:
-    """Return the approximate size in pixels of the smallest bounding box that can enclose every line of text at a font size of 1pt"""
-    font_file = findfont(font)
-    font_image = PILtruetype(font_file, size=1000)
-    text_sizes = map(font_image.getsize, lines)
-    tuple_max = lambda a, b: Size(max(a[0], b[0]), max(a[1], b[1]))
-    max_size_at_1000 = reduce(tuple_max, text_sizes, Size(0, 0))
-    return Size(max_size_at_1000.width / 1000, max_size_at_1000.height / 1000)
+def get_max_text_size(lines: List[str], font_image: ImageFont) -> Size:
+    """Return the approximate size in pixels of the smallest bounding box that can enclose every line of text at a font size of 1pt
+
+    Measured with an already loaded font, which should be large, so that
+    rounding doesn't skew the result"""
+    # Character lists often repeat lines, and each only needs measuring once
+    unique_lines = dict.fromkeys(lines)
+    if not unique_lines:
+        return Size(0, 0)
+    # Each (width, height) fills a row of an N×2 array directly
+    text_sizes = np.fromiter(
+        (_text_size(font_image, line) for line in unique_lines),
+        dtype=np.dtype((np.int32, 2)),
+        count=len(unique_lines),
+    )
+    max_width, max_height = text_sizes.max(axis=0).tolist()
+    return Size(max_width / font_image.size, max_height / font_image.size)
 
 
 def get_font(
     lines: List[str], canvas_size: Size, padding: Num, font_name: str = default_font,
 ) -> ImageFont:
-    max_text_size = get_max_text_size(lines=lines, font=font_name)
+    font_file = _find_font_file(font_name)
+    reference_font = _truetype(font_file, 1000)
+    max_text_size = get_max_text_size(lines=lines, font_image=reference_font)
     if max_text_size.height <= 0 or max_text_size.width <= 0:
         logging.warn("No text will be drawn")
-        font_file = findfont(font_name)
-        return PILtruetype(font_file, size=1)
+        return _truetype(font_file, 1)
 
-    usable_width = canvas_size.width - padding * canvas_size.width
-    usable_height = canvas_size.height - padding * canvas_size.height
+    area = padded_area(canvas_size=canvas_size, padding=padding)
+    usable_width = area.usable_width
+    usable_height = area.usable_height
     if usable_height < 10:
         logging.warn(f"The text will have a height of {usable_height}px")
     if usable_width < 10:
@@ -206,11 +496,27 @@ def get_font(
     max_font_size_height = usable_height / max_text_size.height
     max_font_size_width = usable_width / max_text_size.width
     # Which scale factor won't overflow the useable area?
-    # NOTE: Subtracting 1 because getsize(text) rounds up
-    font_size = math.floor(min(max_font_size_height, max_font_size_width)) - 1
-    font_file = findfont(font_name)
-    font_image = PILtruetype(font_file, size=font_size)
-    return font_image
+    font_size = max(math.floor(min(max_font_size_height, max_font_size_width)), 1)
+
+    # Glyph metrics don't scale exactly linearly because of hinting and
+    # rounding, so the estimate is checked against the font at that size.
+    # Every line is checked, since rounding at small sizes can make any line
+    # the largest, but only a few sizes are tried
+    unique_lines = list(dict.fromkeys(lines))
+
+    def fits(size: int) -> bool:
+        font_image = _truetype(font_file, size)
+        return all(
+            _text_size(font_image, line).width <= usable_width
+            and _text_size(font_image, line).height <= usable_height
+            for line in unique_lines
+        )
+
+    while font_size > 1 and not fits(font_size):
+        font_size -= 1
+    while fits(font_size + 1):
+        font_size += 1
+    return _truetype(font_file, font_size)
 
 
 def setup_logging(level: Optional[LogLevel] = default_log_level) -> None:
@@ -231,14 +537,18 @@ def main(
     file_or_list: Union[SPath, List[str]],
     output_dir: SPath = default_output_dir,
     log_level: Optional[LogLevel] = default_log_level,
-    font: Optional[Union[str, ImageFont]] = default_font,
+    font: Optional[Union[str, FreeTypeFont, ImageFont]] = default_font,
     size: Optional[Union[str, Size]] = default_canvas_size,
     padding: Optional[Union[str, Num]] = default_padding,
     background: Optional[str] = default_background,
     text_color: Optional[str] = default_text_color,
     clobber: Optional[bool] = False,
+    compress_level: Optional[Union[str, int]] = default_compress_level,
 ) -> List[Path]:
     setup_logging(level=log_level)
+    # Drop the text measurements from a previous run, which won't be asked for
+    # again; the loaded fonts stay cached by _truetype
+    _text_size.cache_clear()
 
     if not size:
         canvas_size = default_canvas_size
@@ -257,23 +567,24 @@ def main(
 
     output_directory = Path(output_dir or default_output_dir)
 
-    if not output_directory.exists():
-        try:
-            output_directory.mkdir()
-        except Exception as err:
-            raise error(f"Can't make directory '{output_directory}'")
+    try:
+        resolved_directory = ensure_output_dir(output_directory)
+    except OSError as err:
+        raise error(f"Can't make directory '{output_directory}'") from err
 
     lines = get_characters(
         text_file_or_list=file_or_list,
-        directory=output_dir,
+        directory=resolved_directory,
         clobber=(clobber if clobber != None else False),
     )
+    # Repeated lines would only overwrite the same picture, so each is drawn once
+    lines = list(dict.fromkeys(lines))
 
     if not lines:
         logging.info("No pictures will be generated")
         return list()
 
-    if isinstance(font, ImageFont):
+    if isinstance(font, (FreeTypeFont, ImageFont)):
         image_font = font
     else:
         image_font = get_font(
@@ -287,17 +598,87 @@ def main(
 
     fill_color = getrgb(color=(text_color or default_text_color))
 
-    for text in lines:
-        generate_png(
-            text=text,
-            font=image_font,
-            canvas_size=canvas_size,
-            padding=pad,
-            background=background_color,
-            fill_color=fill_color,
-        ).save(
-            fp=assign_path(text=text, dir=output_directory), format="PNG",
+    compress_level_or_default = (
+        default_compress_level if compress_level == None else compress_level
+    )
+    try:
+        level = int(compress_level_or_default)
+    except ValueError as err:
+        raise error(
+            f"Expected compression level to be like '1', instead got '{compress_level}'"
+        )
+    if not 0 <= level <= 9:
+        raise error(
+            f"Expected compression level to be from 0 to 9, instead got '{compress_level}'"
+        )
+
+    directory_name = str(resolved_directory)
+    out_paths = [assign_path(text=text, dir=directory_name) for text in lines]
+    settings = RenderSettings(
+        canvas_size=canvas_size,
+        area=padded_area(canvas_size=canvas_size, padding=pad),
+        background=background_color,
+        fill_color=fill_color,
+        compress_level=level,
+    )
+    # Worker processes load the font again from its file, which only works
+    # for a TrueType or OpenType font that was opened from a path
+    reloadable = isinstance(image_font, FreeTypeFont) and isinstance(
+        image_font.path, (str, bytes, os.PathLike)
+    )
+    if reloadable:
+        settings = settings._replace(
+            font_file=os.fspath(image_font.path),
+            font_size=image_font.size,
+            font_index=image_font.index,
+            font_encoding=image_font.encoding,
+            font_layout_engine=image_font.layout_engine,
         )
+    else:
+        settings = settings._replace(font=image_font)
+    workers = os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(settings)
+        for text, out_path in zip(lines, out_paths):
+            _render_and_save(text, out_path)
+    elif len(lines) < 2 * workers or not reloadable:
+        # Starting worker processes costs more than it saves for a few
+        # pictures, and they couldn't load a font that isn't from a file, but
+        # Pillow releases the GIL while compressing, so threads can still
+        # encode them in parallel. Drawing is quick, so it stays on this
+        # thread, with a copy of the canvas handed to each encoder, which lets
+        # the next picture be drawn while the last ones are compressed
+        _init_worker(settings)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            saves = [
+                executor.submit(_save, picture=_render(text).copy(), out_path=out_path)
+                for text, out_path in zip(lines, out_paths)
+            ]
+            try:
+                for save in as_completed(saves):
+                    save.result()
+            except Exception:
+                # Don't keep writing pictures after one has failed
+                for save in saves:
+                    save.cancel()
+                raise
+    else:
+        # Each picture is independent, so they're rendered and encoded in
+        # parallel, a chunk of lines per task to keep the back-and-forth low
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(settings,)
+        ) as executor:
+            chunksize = max(1, len(lines) // (workers * 4))
+            try:
+                list(
+                    executor.map(
+                        _render_and_save, lines, out_paths, chunksize=chunksize
+                    )
+                )
+            except Exception:
+                # Don't keep writing pictures after one has failed
+                executor.shutdown(cancel_futures=True)
+                raise
 
     return [output_directory / (f"{line}.png") for line in lines]
 
@@ -315,14 +696,12 @@ if __name__ == "__main__":
             raise ArgumentTypeError(f"{dir} needs to be a directory that exists")
 
     def create_if_absent(path: str) -> Path:
-        dir = Path(path)
-        if not dir.exists():
-            dir.mkdir()
-
-        if not dir.is_dir():
-            raise ArgumentTypeError(f"'{dir}' must be a directory")
+        try:
+            ensure_output_dir(path)
+        except FileExistsError:
+            raise ArgumentTypeError(f"'{path}' must be a directory")
 
-        return dir
+        return Path(path)
 
     def parse_log_level(level: str) -> int:
         levels = {
@@ -376,6 +755,13 @@ if __name__ == "__main__":
         action="store_true",
         help="If passed, will overwrite existing files; otherwise, nothing is clobbered",
     )
+    parser.add_argument(
+        "--compress-level",
+        type=int,
+        choices=range(10),
+        default=default_compress_level,
+        help="zlib compression level for the pictures, from 0 (fastest) to 9 (smallest)",
+    )
     parser.add_argument(
         "--log",
         default=default_log_level,
@@ -396,4 +782,5 @@ if __name__ == "__main__":
         background=args.background,
         text_color=args.text_color,
         clobber=args.clobber,
+        compress_level=args.compress_level,
     )